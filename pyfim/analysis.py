@@ -186,12 +186,13 @@ def stop_duration(exp):
 
     mean_duration = []
 
+    # Stop phases are also needed by stops() - compute them only once
+    all_stop_phases = exp.get_cached('stop_phases', lambda: _stop_phases(exp))
+
     # Iterate over all objects
     for obj in exp.go_phase:
         # Find stop and go phases
-        stop_phases = binary_phases( exp.go_phase[obj].values,
-                                      mode='OFF',
-                                      min_len=defaults['MIN_STOP_PHASE'] )
+        stop_phases = all_stop_phases[obj]
 
         if len(stop_phases) > 0:
             # Add mean duration
@@ -229,18 +230,32 @@ def stops(exp):
 
     mean_freq = []
 
+    # Stop phases are also needed by stop_duration() - compute them only once
+    all_stop_phases = exp.get_cached('stop_phases', lambda: _stop_phases(exp))
+
     # Iterate over all objects
     for obj in exp.go_phase:
         # Find stop and go phases
-        stop_phases = binary_phases( exp.go_phase[obj].values,
-                                      mode='OFF',
-                                      min_len=defaults['MIN_STOP_PHASE'] )
+        stop_phases = all_stop_phases[obj]
         # Add mean frequency
         mean_freq.append( len(stop_phases) / ( exp.go_phase[obj].dropna().shape[0] / defaults['FPS'] ) )
 
     return pd.Series(mean_freq, index=exp.go_phase.columns)
 
 
+def _stop_phases(exp):
+    """ Low-level function: extracts each object's stop phases. Results are
+    shared between analyses via :func:`~pyfim.Experiment.get_cached`.
+    """
+
+    # Important: do NOT add this to __all__ -> otherwise this will be run as analysis
+
+    return { obj: binary_phases( exp.go_phase[obj].values,
+                                 mode='OFF',
+                                 min_len=defaults['MIN_STOP_PHASE'] )
+             for obj in exp.go_phase }
+
+
 def pause_turns(exp):
     """ Calculates the frequency of pause-turns [Hz] for each object. This
     analysis is based on MatLab code by Dimitri Berh (University of Muenster,
@@ -343,17 +358,21 @@ def bending_strength(exp, during=None):
 
     bend_strength = []
 
+    # Absolute bending angles are also needed by head_bends() - compute
+    # them for all objects only once
+    abs_bending = exp.get_cached('abs_bending', lambda: ( exp.bending - 180 ).abs())
+
     # Iterate over all objects
     for obj in exp.bending:
         if during == 'go':
-            this_bend = exp.bending[obj][ ( exp.go_phase[obj] == 1 ) & ( ~exp.bending[obj].isnull() ) ]
+            this_bend = abs_bending[obj][ ( exp.go_phase[obj] == 1 ) & ( ~exp.bending[obj].isnull() ) ]
         elif during == 'stop':
-            this_bend = exp.bending[obj][ ( exp.go_phase[obj] == 0 ) & ( ~exp.bending[obj].isnull() ) ]
+            this_bend = abs_bending[obj][ ( exp.go_phase[obj] == 0 ) & ( ~exp.bending[obj].isnull() ) ]
         else:
-            this_bend = exp.bending[obj]
+            this_bend = abs_bending[obj]
 
-        # Get absolute bending angles and remove NaNs
-        abs_bend = ( this_bend - 180 ).abs().dropna()
+        # Remove NaNs
+        abs_bend = this_bend.dropna()
 
         # Filter to above threshold bendings
         abs_bend = abs_bend[ abs_bend >= defaults['BENDING_ANGLE_THRESHOLD_FOR_BENDING_STRENGTH'] ]
@@ -393,10 +412,14 @@ def head_bends(exp):
 
     mean_freq = []
 
+    # Absolute bending angles are also needed by bending_strength() -
+    # compute them for all objects only once
+    abs_bending = exp.get_cached('abs_bending', lambda: ( exp.bending - 180 ).abs())
+
     # Iterate over all objects
     for obj in exp.bending:
         # Get absolute bending angles and remove NaNs
-        abs_bend = ( exp.bending[obj] - 180 ).abs().dropna()
+        abs_bend = abs_bending[obj].dropna()
 
         # Get above threshold bendings
         is_bend = abs_bend >= defaults['BENDING_ANGLE_THRESHOLD']
@@ -6,6 +6,7 @@ default_parameters = dict(
 # Input files
 FILE_FORMAT               = '.csv', # File format to search for
 DELIMITER                 = ',',    # Delimiter in CSV file
+FAST_IO                   = False,  # If True, will use pyarrow (if installed) to read CSV files
 
 # Spatial resolution
 PIXEL2MM                  = False,  # If True, pixel coords are converted to mm or mm^2